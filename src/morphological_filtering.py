@@ -15,17 +15,43 @@
 """
 Language-specific morphological target filtering.
 """
+import marisa_trie
+import multiprocessing
+import numba
+import numpy as np
+import os
 import pymorphy2
+import re
 import spacy
 import string
 import sys
-from itertools import zip_longest
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice, zip_longest
 from pymorphy2.tokenizers import simple_word_tokenize
-from spacy.lang.he import Hebrew
-from spacy.tokens.token import Token
-from typing import Dict, List, Tuple
+from spacy.tokens.doc import Doc
+from typing import Dict, Iterable, Iterator, List, Tuple
 
-from utils import FEM_LABEL, GERMAN_MORPH_DICT, MSC_LABEL, OTHER_LABEL, PUNCTUATION_STRIPPER
+from utils import BATCH_SIZE, FEM_LABEL, GERMAN_GENDER_CODES_CACHE, GERMAN_MORPH_CACHE, GERMAN_MORPH_DICT, \
+    IO_BUFFER_SIZE, MSC_LABEL, OTHER_LABEL, WORD_CACHE_SIZE, WORD_PATTERN, read_lines
+
+# filterer used by each worker process when target filtering runs in parallel
+_worker_filterer = None
+
+# integer codes used to store gender labels in lookup tables; code 0 is also used for words without a gender.
+# the German gender cache stores these codes, so bump GERMAN_MORPH_CACHE_VERSION when changing them
+GENDER_LABELS = (OTHER_LABEL, FEM_LABEL, MSC_LABEL)
+GENDER_CODES = {label: code for code, label in enumerate(GENDER_LABELS)}
+
+# range of the Hebrew unicode block, which Hebrew words are made up of
+HEBREW_BLOCK_START, HEBREW_BLOCK_END = 0x0590, 0x05FF
+HEBREW_ALEF, HEBREW_TAV = ord("א"), ord("ת")
+
+# line of the German dictionary with a feminine or masculine noun: the word, followed by a tag of at least three fields.
+# bump GERMAN_MORPH_CACHE_VERSION when changing it, so that the cached gender trie is rebuilt
+GERMAN_NOUN_GENDER_PATTERN = re.compile(rb'^[^\S\n]*(\S+)[^\S\n]+NN,(fem|masc),', re.MULTILINE)
 
 
 class MorphFilterer:
@@ -38,12 +64,13 @@ class MorphFilterer:
         # (because we want to detect cases where a *different* gender from the source is present)
         self.OTHER_GENDER_LABELS = {FEM_LABEL: {MSC_LABEL}, MSC_LABEL: {FEM_LABEL}}
 
-    def _get_gender_per_word(self, sentence: str) -> List[str]:
+    def _get_gender_per_word(self, sentence: str) -> Iterable[str]:
         """
-        Get the morphological gender for each word in the sentence.
+        Get the morphological gender for each word in the sentence. Implementations should analyze the words lazily
+        where possible, so that `_matches_gender` can stop at the first word with a non-indicated gender.
 
         :param sentence: Untokenized string corresponding to the sentence.
-        :return: List containing gender (FEM_LABEL, MSC_LABEL, OTHER_LABEL) for each word.
+        :return: Iterable containing gender (FEM_LABEL, MSC_LABEL, OTHER_LABEL) for each word.
         """
         raise NotImplementedError
 
@@ -57,7 +84,16 @@ class MorphFilterer:
         :param gender: Indicated gender that we expect the sentence to match.
         :return: True if the gender matches the indicated gender, else False.
         """
-        gender_per_word = self._get_gender_per_word(sentence)
+        return self._gender_per_word_matches(self._get_gender_per_word(sentence), gender)
+
+    def _gender_per_word_matches(self, gender_per_word: Iterable[str], gender: str) -> bool:
+        """
+        Check whether the genders of the words in a sentence match the indicated gender (see `_matches_gender`).
+
+        :param gender_per_word: Gender label for each word in the sentence.
+        :param gender: Indicated gender that we expect the sentence to match.
+        :return: True if the gender matches the indicated gender, else False.
+        """
         has_matching_gender = False
         for current_gender in gender_per_word:
             if current_gender in self.OTHER_GENDER_LABELS[gender]:
@@ -66,8 +102,103 @@ class MorphFilterer:
                 has_matching_gender = True
         return has_matching_gender
 
-    def target_filter(self, source_input: str, target_input: str, source_output: str, target_output: str, gender: str) \
-            -> Tuple[int, int]:
+    def _matches_gender_batch(self, sentences: List[str], gender: str) -> List[bool]:
+        """
+        Check whether each sentence in a batch matches the indicated gender. Filterers whose analyzer supports batched
+        processing can override this.
+
+        :param sentences: Strings to classify by morphological gender.
+        :param gender: Indicated gender that we expect the sentences to match.
+        :return: For each sentence, True if it matches the indicated gender, else False.
+        """
+        return [self._matches_gender(sentence, gender) for sentence in sentences]
+
+    def _get_init_kwargs(self) -> Dict:
+        """
+        Get the keyword arguments needed to build an equivalent filterer, e.g. in a worker process.
+
+        :return: Keyword arguments for the constructor of this filterer.
+        """
+        return {}
+
+    @staticmethod
+    def _get_batches(in_src: Iterable[bytes], in_trg: Iterable[bytes]) -> Iterator[List[Tuple[bytes, bytes]]]:
+        """
+        Read a parallel dataset in batches of (source, target) line pairs. If one side is longer than the other, its
+        extra lines are ignored with a warning.
+
+        :param in_src: Source side of the parallel data.
+        :param in_trg: Target side of the parallel data.
+        :return: Iterator over batches of at most BATCH_SIZE line pairs.
+        """
+        pairs = zip_longest(in_src, in_trg)
+        batch = list(islice(pairs, BATCH_SIZE))
+        while batch:
+            # once one side runs out it is padded with None, so only the last pair of a batch needs to be checked
+            if None in batch[-1]:
+                warnings.warn('Source and target inputs have different numbers of lines; ignoring the extra lines')
+                batch = [pair for pair in batch if None not in pair]
+                if batch:
+                    yield batch
+                return
+            yield batch
+            batch = list(islice(pairs, BATCH_SIZE))
+
+    def _filter_batch(self, batch: List[Tuple[bytes, bytes]], gender: str) -> List[bool]:
+        """
+        Decide which sentence pairs in a batch to keep after target filtering.
+
+        :param batch: Pairs of UTF-8 encoded source and target sentences.
+        :param gender: Indicated gender to filter the data for.
+        :return: For each sentence pair, True if it should be kept, else False.
+        """
+        # heuristic: ignore translations that just repeat same tokens multiple times,
+        # based on the number of tokens in translation. tokens are approximated by spaces (n tokens have n - 1 spaces
+        # between them), which avoids splitting the lines. a blank source line has no tokens rather than one, so its
+        # pair is only kept if the target line is blank as well
+        is_candidate = [src_line.count(b' ') * 2 + 1 >= trg_line.count(b' ') if src_line.strip()
+                        else not trg_line.strip() for src_line, trg_line in batch]
+        # only keep the sentence pairs where the target sentence matches the indicated gender
+        candidates = [trg_line.decode('utf-8', 'replace') for (_, trg_line), candidate in zip(batch, is_candidate)
+                      if candidate]
+        matches = iter(self._matches_gender_batch(candidates, gender))
+        return [candidate and next(matches) for candidate in is_candidate]
+
+    def _filter_batches(self, batches: Iterable[List[Tuple[bytes, bytes]]], gender: str, num_workers: int) \
+            -> Iterator[Tuple[List[Tuple[bytes, bytes]], List[bool]]]:
+        """
+        Run `_filter_batch` over a stream of batches, optionally spread over a pool of worker processes.
+
+        :param batches: Batches of pairs of source and target sentences.
+        :param gender: Indicated gender to filter the data for.
+        :param num_workers: Number of worker processes; if 1, batches are filtered in the current process.
+        :return: Iterator over each batch together with its result from `_filter_batch`, in input order.
+        """
+        if num_workers == 1:
+            for batch in batches:
+                yield batch, self._filter_batch(batch, gender)
+            return
+        # each worker builds its own filterer, unless it is forked (the platform default on Linux), in which case it
+        # inherits the already loaded one from this process
+        mp_context = multiprocessing.get_context()
+        initargs = (type(self), self._get_init_kwargs())
+        if mp_context.get_start_method() == 'fork':
+            initargs += (self,)
+        with ProcessPoolExecutor(max_workers=num_workers, mp_context=mp_context, initializer=_init_worker,
+                                 initargs=initargs) as pool:
+            pending = deque()
+            for batch in batches:
+                pending.append((batch, pool.submit(_filter_batch_in_worker, batch, gender)))
+                # limit the number of batches in flight so that the input is not read into memory all at once
+                if len(pending) >= 2 * num_workers:
+                    batch, result = pending.popleft()
+                    yield batch, result.result()
+            while pending:
+                batch, result = pending.popleft()
+                yield batch, result.result()
+
+    def target_filter(self, source_input: str, target_input: str, source_output: str, target_output: str, gender: str,
+                      num_workers: int = 1) -> Tuple[int, int]:
         """
         Run morphological target filtering for a parallel dataset.
 
@@ -76,51 +207,100 @@ class MorphFilterer:
         :param source_output: Name of the source output file after target filtering.
         :param target_output: Name of the target output file after target filtering.
         :param gender: Indicated gender to filter the data for.
+        :param num_workers: Number of worker processes to use for filtering.
         :return: Total count of sentences in the file, and count of sentences kept after filtering.
         """
         count_total, count_kept = 0, 0
-        with open(source_input, 'r') as in_src, open(target_input, 'r') as in_trg, \
-                open(source_output, 'w') as out_src, open(target_output, 'w') as out_trg:
-            for src_line, trg_line in zip_longest(in_src, in_trg):
-                count_total += 1
+        # lines are only decoded for classification; kept lines are written out unchanged
+        with open(source_output, 'wb', buffering=IO_BUFFER_SIZE) as out_src, \
+                open(target_output, 'wb', buffering=IO_BUFFER_SIZE) as out_trg:
+            batches = self._get_batches(read_lines(source_input), read_lines(target_input))
+            for batch, keep in self._filter_batches(batches, gender, num_workers):
+                count_total += len(batch)
                 if count_total % 10000 == 0:
                     sys.stderr.write(f'Processing line {count_total} from {target_input}\n')
-                # heuristic: ignore translations that just repeat same tokens multiple times,
-                # based on the number of tokens in translation
-                if len(src_line.split()) * 2 < len(trg_line.split()):
-                    continue
-                # only keep the sentence pair if the target sentence matches the indicated gender
-                if self._matches_gender(trg_line, gender):
-                    count_kept += 1
-                    out_src.write(src_line)
-                    out_trg.write(trg_line)
+                kept_pairs = [pair for pair, keep_pair in zip(batch, keep) if keep_pair]
+                count_kept += len(kept_pairs)
+                out_src.writelines(src_line for src_line, _ in kept_pairs)
+                out_trg.writelines(trg_line for _, trg_line in kept_pairs)
         return count_total, count_kept
 
 
+def _init_worker(filterer_class: type, filterer_kwargs: Dict, filterer: MorphFilterer = None):
+    """
+    Set the filterer used by a worker process for parallel target filtering.
+
+    :param filterer_class: Class of the filterer, used to build a new filterer in the worker.
+    :param filterer_kwargs: Keyword arguments for building the filterer.
+    :param filterer: Filterer to use directly instead of building one; only passed to forked workers.
+    """
+    global _worker_filterer
+    _worker_filterer = filterer if filterer is not None else filterer_class(**filterer_kwargs)
+
+
+def _filter_batch_in_worker(batch: List[Tuple[bytes, bytes]], gender: str) -> List[bool]:
+    """Run `MorphFilterer._filter_batch` in a worker process for parallel target filtering."""
+    return _worker_filterer._filter_batch(batch, gender)
+
+
 class GermanMorphFilterer(MorphFilterer):
     """Morphological filterer for German based on DEMorphy German Morphological Dictionaries."""
     def __init__(self):
         super().__init__()
-        self.gender_dict = self._get_gender_dict()
+        self.gender_trie, self.gender_codes = self._get_gender_trie()
+        # a trie lookup costs more than a cache hit, and word frequencies are heavily skewed
+        self._classify_word = lru_cache(maxsize=WORD_CACHE_SIZE)(self._classify_word)
+
+    @classmethod
+    def _get_gender_trie(cls) -> Tuple[marisa_trie.Trie, bytes]:
+        """
+        Get the gender trie and gender code table for DE. The dictionary is large, so rather than a python dict it is
+        stored as a compact trie that maps each word to an id, and a table that maps each id to a gender code (see
+        GENDER_CODES). The table has an extra entry at the end for words that are not in the trie. Both are cached next
+        to the dictionary and loaded from there on later runs, unless the dictionary has changed since.
+        """
+        dict_mtime = os.path.getmtime(GERMAN_MORPH_DICT)
+        if all(os.path.exists(cache) and os.path.getmtime(cache) >= dict_mtime
+               for cache in (GERMAN_MORPH_CACHE, GERMAN_GENDER_CODES_CACHE)):
+            gender_trie = marisa_trie.Trie()
+            gender_trie.load(GERMAN_MORPH_CACHE)
+            with open(GERMAN_GENDER_CODES_CACHE, 'rb') as codes_file:
+                gender_codes = codes_file.read()
+            sys.stderr.write(f'Finished loading gender trie from {GERMAN_MORPH_CACHE}\n')
+            return gender_trie, gender_codes
+
+        gender_dict = cls._get_gender_dict()
+        gender_trie = marisa_trie.Trie(gender_dict)
+        gender_codes = bytearray(len(gender_trie) + 1)
+        for word, gender in gender_dict.items():
+            gender_codes[gender_trie.key_id(word)] = GENDER_CODES[gender]
+        gender_codes = bytes(gender_codes)
         sys.stderr.write(f'Finished reading gender dict from {GERMAN_MORPH_DICT}\n')
+        try:
+            # write to temporary files first so that concurrent runs never read a partially written cache
+            tmp_suffix = f'.{os.getpid()}.tmp'
+            with open(GERMAN_GENDER_CODES_CACHE + tmp_suffix, 'wb') as codes_file:
+                codes_file.write(gender_codes)
+            gender_trie.save(GERMAN_MORPH_CACHE + tmp_suffix)
+            os.replace(GERMAN_GENDER_CODES_CACHE + tmp_suffix, GERMAN_GENDER_CODES_CACHE)
+            os.replace(GERMAN_MORPH_CACHE + tmp_suffix, GERMAN_MORPH_CACHE)
+        except OSError as e:
+            sys.stderr.write(f'Could not cache gender trie to {GERMAN_MORPH_CACHE}: {e}\n')
+        return gender_trie, gender_codes
 
     @staticmethod
     def _get_gender_dict() -> Dict[str, str]:
         """Get the gender dictionary (mapping of word to gender label) for the supported genders for DE."""
         gender_dict = {}
         fem_morphs, msc_morphs = set(), set()
-        with open(GERMAN_MORPH_DICT, 'r') as morphs:
-            for line in morphs:
-                # read in each word and its corresponding gender
-                line = line.strip().split()
-                if len(line) > 1:
-                    tag = line[1].split(',')
-                    if len(tag) > 2:
-                        if tag[0] == 'NN':
-                            if tag[1] == 'fem':
-                                fem_morphs.add(line[0].lower())
-                            elif tag[1] == 'masc':
-                                msc_morphs.add(line[0].lower())
+        with open(GERMAN_MORPH_DICT, 'rb') as morphs:
+            # read in each noun and its corresponding gender (from tags such as 'NN,fem,acc,sing') in one regex pass
+            for match in GERMAN_NOUN_GENDER_PATTERN.finditer(morphs.read()):
+                word, gender = match.group(1).decode('utf-8').lower(), match.group(2)
+                if gender == b'fem':
+                    fem_morphs.add(word)
+                else:
+                    msc_morphs.add(word)
         # if a word occurs with both feminine and masculine gender, exclude it
         for word in fem_morphs:
             if word not in msc_morphs:
@@ -131,58 +311,106 @@ class GermanMorphFilterer(MorphFilterer):
         return gender_dict
 
     def _get_gender_per_word(self, sentence):
-        sentence = sentence.translate(PUNCTUATION_STRIPPER)
-        words = set(sentence.strip().lower().split())
-        gender_per_word = []
-        for word in words:
-            if word in self.gender_dict:
-                gender_per_word.append(self.gender_dict[word])
-            else:
-                gender_per_word.append(OTHER_LABEL)
-        return gender_per_word
+        for word in WORD_PATTERN.findall(sentence.lower()):
+            yield self._classify_word(word)
+
+    def _classify_word(self, word: str) -> str:
+        """
+        Get the gender of a single word from the dictionary. Results are cached per instance.
+
+        :param word: Lowercased word to classify.
+        :return: Gender label of the word.
+        """
+        return GENDER_LABELS[self.gender_codes[self.gender_trie.get(word, len(self.gender_trie))]]
 
 
 class HebrewMorphFilterer(MorphFilterer):
     """Filterer for Hebrew using heuristics based on characters (following WinoMT)."""
+    # words are runs of characters from the Hebrew unicode block
+    HEBREW_WORD_PATTERN = re.compile(r'[\u0590-\u05FF]+')
+
     def __init__(self):
         super().__init__()
-        self.tokenizer = Hebrew().tokenizer
         self.fem_chars = {"ת", "ה"}
         self.msc_chars = {"ק", "ד", "ר", "ש", "ט", "ב", "א", "ך", "ל", "ס"}
+        # gender code for each character of the Hebrew block, used by `_hebrew_matches_gender`
+        self.char_genders = np.zeros(HEBREW_BLOCK_END - HEBREW_BLOCK_START + 1, dtype=np.uint8)
+        for chars, label in ((self.fem_chars, FEM_LABEL), (self.msc_chars, MSC_LABEL)):
+            for char in chars:
+                self.char_genders[ord(char) - HEBREW_BLOCK_START] = GENDER_CODES[label]
 
     def _get_gender_per_word(self, sentence):
-        tokens = set([self.tokenizer(tok).text for tok in sentence.split()])
-        gender_per_word = []
-        for word in tokens:
-            if word != "את":
-                if word[-1] in self.fem_chars:
-                    gender_per_word.append(FEM_LABEL)
-                elif word[-1] in self.msc_chars:
-                    gender_per_word.append(MSC_LABEL)
-                else:
-                    gender_per_word.append(OTHER_LABEL)
+        # filtering itself goes through `_matches_gender`, which applies the same rule in compiled code
+        for match in self.HEBREW_WORD_PATTERN.finditer(sentence):
+            word = match.group(0)
+            if word == "את":
+                yield OTHER_LABEL
             else:
-                gender_per_word.append(OTHER_LABEL)
-        return gender_per_word
+                yield GENDER_LABELS[self.char_genders[ord(word[-1]) - HEBREW_BLOCK_START]]
+
+    def _matches_gender(self, sentence, gender):
+        # scan the code points of the whole sentence in compiled code rather than word by word
+        codepoints = np.frombuffer(sentence.encode('utf-32-le'), dtype=np.uint32)
+        return _hebrew_matches_gender(codepoints, self.char_genders, GENDER_CODES[gender])
+
+
+@numba.njit(cache=True)
+def _hebrew_matches_gender(codepoints: np.ndarray, char_genders: np.ndarray, gender_code: int) -> bool:
+    """
+    Check whether a Hebrew sentence matches the indicated gender (see `HebrewMorphFilterer`), in a single pass over its
+    characters.
+
+    :param codepoints: Unicode code points of the sentence.
+    :param char_genders: Gender code implied by each character of the Hebrew block when it ends a word (0 for none).
+    :param gender_code: Gender code of the indicated gender.
+    :return: True if the sentence matches the indicated gender, else False.
+    """
+    has_matching_gender = False
+    word_start = 0
+    for i in range(len(codepoints) + 1):
+        if i < len(codepoints) and HEBREW_BLOCK_START <= codepoints[i] <= HEBREW_BLOCK_END:
+            continue
+        # the word (if any) ends just before i; the word "את" is excluded
+        if i > word_start and not (i - word_start == 2 and codepoints[word_start] == HEBREW_ALEF
+                                   and codepoints[i - 1] == HEBREW_TAV):
+            word_gender = char_genders[codepoints[i - 1] - HEBREW_BLOCK_START]
+            if word_gender == gender_code:
+                has_matching_gender = True
+            elif word_gender != 0:
+                return False
+        word_start = i + 1
+    return has_matching_gender
 
 
 class RussianMorphFilterer(MorphFilterer):
     """Morphological filterer for Russian using pymorphy2."""
     def __init__(self):
         super().__init__()
-        self.tagger = pymorphy2.MorphAnalyzer()
-        # update gender label dicts according to pymorphy2 labels
-        self.MATCH_GENDER_LABELS[FEM_LABEL].update({'femn'})
-        self.MATCH_GENDER_LABELS[MSC_LABEL].update({'masc'})
-        self.OTHER_GENDER_LABELS[FEM_LABEL].update({'masc'})
-        self.OTHER_GENDER_LABELS[MSC_LABEL].update({'femn'})
+        # result_type=None returns plain tuples from parse() rather than Parse objects
+        self.tagger = pymorphy2.MorphAnalyzer(result_type=None)
+        self._parse = self.tagger.parse
+        # word frequencies are heavily skewed and parsing is expensive, so memoize the per-word analysis
+        self._classify_word = lru_cache(maxsize=WORD_CACHE_SIZE)(self._classify_word)
 
     def _get_gender_per_word(self, sentence):
-        tokens = simple_word_tokenize(sentence)
-        gender_per_word = []
-        for word in tokens:
-            gender_per_word.append(self.tagger.parse(word)[0].tag.gender)
-        return gender_per_word
+        for word in simple_word_tokenize(sentence):
+            yield self._classify_word(word)
+
+    def _classify_word(self, word: str) -> str:
+        """
+        Get the morphological gender of a single word, independent of its context. Results are cached per instance.
+
+        :param word: Word to classify.
+        :return: Gender label of the word.
+        """
+        # check the gender grammemes of the most likely parse directly instead of going through the `gender` property,
+        # and map them straight to our gender labels
+        tag = self._parse(word)[0][1]
+        if 'femn' in tag:
+            return FEM_LABEL
+        elif 'masc' in tag:
+            return MSC_LABEL
+        return OTHER_LABEL
 
 
 class SpacyMorphFilterer(MorphFilterer):
@@ -191,42 +419,49 @@ class SpacyMorphFilterer(MorphFilterer):
 
     :param lang: Target language to filter for -- 'fr' or 'it'.
     """
+    # gender feature within the morphology part of a fine-grained tag
+    GENDER_FEATURE_PATTERN = re.compile(r'(?:__|\|)Gender=([^|]+)')
+
     def __init__(self, lang: str):
         super().__init__()
         self.lang = lang
         assert self.lang in ('fr', 'it'), 'Morphological filtering using spaCy only supported for fr and it'
         self.nlp = spacy.load(self.lang, disable=['parser', 'ner'])
+        self._get_tag_gender = lru_cache(maxsize=None)(self._get_tag_gender)
         # update gender label dicts according to spaCy labels
         self.MATCH_GENDER_LABELS[FEM_LABEL].update({'Fem'})
         self.MATCH_GENDER_LABELS[MSC_LABEL].update({'Masc'})
         self.OTHER_GENDER_LABELS[FEM_LABEL].update({'Masc'})
         self.OTHER_GENDER_LABELS[MSC_LABEL].update({'Fem'})
 
+    def _get_init_kwargs(self):
+        return {'lang': self.lang}
+
     def _get_gender_per_word(self, sentence: str) -> List[str]:
         # morphological analysis of the sentence
-        sentence = self.nlp(sentence)
-        tokens = list(map(self._get_morphology_dict, sentence))
+        return self._get_gender_per_token(self.nlp(sentence))
 
-        gender_per_word = []
-        for word in tokens:
-            if 'Gender' in word:
-                gender_per_word.append(word['Gender'])
-            else:
-                gender_per_word.append(OTHER_LABEL)
-        return gender_per_word
+    def _matches_gender_batch(self, sentences: List[str], gender: str) -> List[bool]:
+        # run the spaCy pipeline over the whole batch at once rather than once per sentence
+        docs = self.nlp.pipe(sentences, batch_size=BATCH_SIZE)
+        return [self._gender_per_word_matches(self._get_gender_per_token(doc), gender) for doc in docs]
 
-    @staticmethod
-    def _get_morphology_dict(token: Token) -> Dict:
+    def _get_gender_per_token(self, doc: Doc) -> List[str]:
+        """
+        Get the morphological gender for each token in a sentence analyzed by spaCy.
+
+        :param doc: spaCy document for the sentence.
+        :return: List containing gender for each token.
+        """
+        return [self._get_tag_gender(token.tag_) for token in doc]
+
+    def _get_tag_gender(self, tag: str) -> str:
         """
-        Get the morphology dictionary from a token (generated by spaCy).
+        Get the gender from a fine-grained spaCy tag, which includes the morphology (e.g. 'NOUN__Gender=Fem|Number=Sing').
+        Results are cached per instance, since the tag set is small.
 
-        :param token: spaCy token for which to get the morphology dictionary.
-        :return: Dictionary of morphology information for the token.
+        :param tag: Fine-grained tag of a token.
+        :return: Gender of the token, or OTHER_LABEL if the tag does not specify a gender.
         """
-        if '__' not in token.tag_:
-            return {}
-        morphology = token.tag_.split('__')[1]
-        if morphology == '_':
-            return {}
-        morphology_dict = dict([prop.split('=') for prop in morphology.split('|')])
-        return morphology_dict
+        match = self.GENDER_FEATURE_PATTERN.search(tag)
+        return match.group(1) if match else OTHER_LABEL
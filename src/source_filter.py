@@ -16,27 +16,44 @@
 Run source filtering on an English dataset based on a wordlist. Write feminine-specific and masculine-specific sentences
 to separate files.
 """
+import ahocorasick
 import argparse
 import string
 import sys
-from typing import Set
 
-from utils import FEM_LABEL, MSC_LABEL, OTHER_LABEL, PUNCTUATION_STRIPPER
+from utils import BATCH_SIZE, FEM_LABEL, IO_BUFFER_SIZE, MSC_LABEL, OTHER_LABEL, read_lines
 
-FEM_PRO = set('she,her,herself,hers'.split(','))
-MSC_PRO = set('he,him,his,himself'.split(','))
+FEM_PRO = frozenset('she,her,herself,hers'.split(','))
+MSC_PRO = frozenset('he,him,his,himself'.split(','))
 
 # gendered English words based on https://github.com/uclanlp/corefBias/blob/master/WinoBias/wino/generalized_swaps.txt.
-# we also include the gendered pronouns in these lists.
-FEM_WORDS = set('Ms,Mrs,Ms.,Mrs.,madam,woman,women,actress,actresses,airwoman,airwomen,aunts,aunt,girl,girls,bride,'
-                'brides,sister,sisters,businesswoman,businesswomen,chairwoman,chairwomen,chick,chicks,mom,moms,mommy,'
-                'mommies,daughter,daughters,mother,mothers,female,females,gal,gals,lady,ladies,granddaughter,'
-                'granddaughters,wife,wives,queen,queens,policewoman,policewomen,princess,princesses,spokeswoman,'
-                'spokeswomen'.split(',')).union(FEM_PRO)
-MSC_WORDS = set('Mr.,Mr,sir,man,men,actor,actors,uncle,uncles,boys,boy,groom,grooms,brother,brothers,'
-                'businessman,businessmen,chairman,chairmen,dude,dudes,dad,dads,daddy,daddies,son,sons,father,fathers,'
-                'male,males,guy,guys,gentleman,gentlemen,grandson,grandsons,husband,husbands,king,kings,lord,lords,'
-                'policeman,policemen,princes,princes,spokesman,spokesmen'.split(',')).union(MSC_PRO)
+# we also include the gendered pronouns in these lists. all words are lowercased, matching `_get_gender`.
+FEM_WORDS = frozenset('Ms,Mrs,Ms.,Mrs.,madam,woman,women,actress,actresses,airwoman,airwomen,aunts,aunt,girl,girls,'
+                      'bride,brides,sister,sisters,businesswoman,businesswomen,chairwoman,chairwomen,chick,chicks,mom,'
+                      'moms,mommy,mommies,daughter,daughters,mother,mothers,female,females,gal,gals,lady,ladies,'
+                      'granddaughter,granddaughters,wife,wives,queen,queens,policewoman,policewomen,princess,'
+                      'princesses,spokeswoman,spokeswomen'.lower().split(',')).union(FEM_PRO)
+MSC_WORDS = frozenset('Mr.,Mr,sir,man,men,actor,actors,uncle,uncles,boys,boy,groom,grooms,brother,brothers,businessman,'
+                      'businessmen,chairman,chairmen,dude,dudes,dad,dads,daddy,daddies,son,sons,father,fathers,male,'
+                      'males,guy,guys,gentleman,gentlemen,grandson,grandsons,husband,husbands,king,kings,lord,lords,'
+                      'policeman,policemen,princes,princes,spokesman,spokesmen'.lower().split(',')).union(MSC_PRO)
+
+
+def _build_wordlist_automaton() -> ahocorasick.Automaton:
+    """
+    Build an Aho-Corasick automaton that finds all occurrences of the gendered words in a line in a single pass.
+
+    :return: Automaton mapping each gendered word to a tuple of the word, its gender, and whether it is a pronoun.
+    """
+    automaton = ahocorasick.Automaton()
+    for words, pronouns, gender in ((FEM_WORDS, FEM_PRO, FEM_LABEL), (MSC_WORDS, MSC_PRO, MSC_LABEL)):
+        for word in words:
+            automaton.add_word(word, (word, gender, word in pronouns))
+    automaton.make_automaton()
+    return automaton
+
+
+WORDLIST_AUTOMATON = _build_wordlist_automaton()
 
 
 def main():
@@ -59,22 +76,31 @@ def main():
     # we define feminine-specific sentences as sentences containing at least one feminine pronoun and no masculine
     # words; masculine-specific is defined similarly.
     count_fem, count_msc, count_total = 0, 0, 0
-    with open(args.input, 'r') as infile, open(feminine_output, 'w') as fem_out, open(masculine_output, 'w') as msc_out:
-        for line in infile:
+    # lines are only decoded for classification; selected lines are written out unchanged
+    with open(feminine_output, 'wb', buffering=IO_BUFFER_SIZE) as fem_out, \
+            open(masculine_output, 'wb', buffering=IO_BUFFER_SIZE) as msc_out:
+        # selected lines are buffered and written out in batches
+        fem_lines, msc_lines = [], []
+        for line in read_lines(args.input):
             count_total += 1
             if count_total % 10000 == 0:
                 sys.stderr.write(f'Processing line {count_total} from {args.input}\n')
-            # for efficiency, skip very long lines
-            if len(line) > 1000:
-                continue
             # note that lines classified as "other" are ignored
-            gender = _get_gender(line)
+            gender = _get_gender(line.decode('utf-8', 'replace'))
             if gender == FEM_LABEL:
                 count_fem += 1
-                fem_out.write(line)
+                fem_lines.append(line)
+                if len(fem_lines) == BATCH_SIZE:
+                    fem_out.writelines(fem_lines)
+                    fem_lines.clear()
             elif gender == MSC_LABEL:
                 count_msc += 1
-                msc_out.write(line)
+                msc_lines.append(line)
+                if len(msc_lines) == BATCH_SIZE:
+                    msc_out.writelines(msc_lines)
+                    msc_lines.clear()
+        fem_out.writelines(fem_lines)
+        msc_out.writelines(msc_lines)
 
     sys.stderr.write(f'Read {count_total} lines from {args.input}\n')
     sys.stderr.write(f'Wrote {count_fem} feminine lines to {feminine_output}\n')
@@ -91,13 +117,24 @@ def _get_gender(line: str) -> str:
     :param line: Line for which to get the gender.
     :return: String corresponding to the gender label of the line (feminine, masculine, or other).
     """
-    words = _get_words(line)
-
-    # check for overlap between the words in the line and in the wordlists
-    has_pro_fem = words & FEM_PRO
-    has_pro_msc = words & MSC_PRO
-    has_word_fem = words & FEM_WORDS
-    has_word_msc = words & MSC_WORDS
+    line = line.lower()
+
+    # find the words from the wordlists in the line, in a single pass
+    has_pro_fem, has_pro_msc, has_word_fem, has_word_msc = False, False, False, False
+    for end, (word, gender, is_pronoun) in WORDLIST_AUTOMATON.iter(line):
+        # only count whole words (e.g. not 'he' in 'the'); words are runs of letters
+        start = end - len(word) + 1
+        if (start > 0 and line[start - 1].isalpha()) or (end + 1 < len(line) and line[end + 1].isalpha()):
+            continue
+        if gender == FEM_LABEL:
+            has_word_fem = True
+            has_pro_fem = has_pro_fem or is_pronoun
+        else:
+            has_word_msc = True
+            has_pro_msc = has_pro_msc or is_pronoun
+        # a pronoun together with a word of the other gender means the line cannot be gender-specific
+        if (has_pro_fem and has_word_msc) or (has_pro_msc and has_word_fem):
+            return OTHER_LABEL
 
     if has_pro_fem and not has_word_msc:
         return FEM_LABEL
@@ -106,18 +143,5 @@ def _get_gender(line: str) -> str:
     return OTHER_LABEL
 
 
-def _get_words(line: str) -> Set[str]:
-    """
-    Get the set of (lowercased and original cased) words from a line.
-
-    :param line: Line from which to get words.
-    :return: Set of words in the line, including their lowercased versions.
-    """
-    # remove all punctuation from the line
-    clean_line = line.strip().translate(PUNCTUATION_STRIPPER)
-    # return words with both the original casing and lowercased versions; this is so we can get cases like 'Mr'
-    return set(clean_line.lower().split()).union(set(clean_line.split()))
-
-
 if __name__ == "__main__":
     main()
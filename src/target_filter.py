@@ -41,7 +41,11 @@ def main():
     parser.add_argument('--target-output', '-to', type=str, required=False, default=None,
                         help='Output file for the target side of the target_filtered corpus. '
                              'Default: `[target_input].target_filtered`.')
+    parser.add_argument('--num-workers', '-w', type=int, required=False, default=1,
+                        help='Number of worker processes to use for target filtering. Default: 1.')
     args = parser.parse_args()
+    if args.num_workers < 1:
+        parser.error('--num-workers must be at least 1')
     source_output, target_output = args.source_output, args.target_output
     if source_output is None:
         source_output = f'{args.source_input}.target_filtered'
@@ -63,7 +67,7 @@ def main():
         raise NotImplementedError(f'Unrecognized language {lang}. Supported languages: {SUPPORTED_LANGUAGES}')
 
     count_total, count_kept = filterer.target_filter(args.source_input, args.target_input, source_output,
-                                                     target_output, args.gender)
+                                                     target_output, args.gender, num_workers=args.num_workers)
 
     sys.stderr.write(f'Read {count_total} lines from {args.source_input} and {args.target_input}\n')
     sys.stderr.write(f'Wrote {count_kept} lines to {source_output} and {target_output} for gender {args.gender}\n')
@@ -16,7 +16,8 @@
 Constants and utility functions.
 """
 import os
-import string
+import re
+from typing import Iterator
 
 FEM_LABEL = 'fem'
 MSC_LABEL = 'msc'
@@ -27,9 +28,44 @@ OTHER_LABEL = 'other'
 # dictionary from https://github.com/DuyguA/german-morph-dictionaries for German target filtering
 GERMAN_MORPH_DICT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
                                  '../german-morph-dictionaries/DE_morph_dict.txt')
+# gender trie built from the German dictionary, cached so that it is only built once. bump the version whenever the
+# cache format, the dictionary parsing or the gender codes change, so that caches written by older code are not loaded
+GERMAN_MORPH_CACHE_VERSION = 1
+GERMAN_MORPH_CACHE = os.path.splitext(GERMAN_MORPH_DICT)[0] + f'.v{GERMAN_MORPH_CACHE_VERSION}.marisa'
+GERMAN_GENDER_CODES_CACHE = os.path.splitext(GERMAN_MORPH_DICT)[0] + f'.v{GERMAN_MORPH_CACHE_VERSION}.genders'
 
-PUNCTUATION_STRIPPER = str.maketrans('', '', string.punctuation)
+# words are maximal runs of letters, which also drops punctuation, digits and underscores
+WORD_PATTERN = re.compile(r'[^\W\d_]+')
+
+# size of the chunks in which input files are read, and of the write buffers of output files
+IO_BUFFER_SIZE = 1 << 20
+
+# number of lines that are processed together during filtering, e.g. passed to a morphological analyzer or written
+BATCH_SIZE = 1000
+
+# maximum number of distinct words whose gender is cached per filterer
+WORD_CACHE_SIZE = 200000
 
 # currently supported genders and target languages
 SUPPORTED_GENDERS = {FEM_LABEL, MSC_LABEL}
 SUPPORTED_LANGUAGES = {'de', 'fr', 'he', 'it', 'ru'}
+
+
+def read_lines(file_name: str) -> Iterator[bytes]:
+    """
+    Read the lines of a file as raw bytes. The file is read in large chunks that are split into lines, which avoids the
+    per-line decoding and newline translation of text mode. Lines are split on '\n' only.
+
+    :param file_name: Name of the file to read.
+    :return: Iterator over the lines in the file, including the trailing newline (if any).
+    """
+    with open(file_name, 'rb', buffering=0) as infile:
+        tail = b''
+        for chunk in iter(lambda: infile.read(IO_BUFFER_SIZE), b''):
+            lines = (tail + chunk).split(b'\n')
+            # the last element is an incomplete line, which is continued by the next chunk
+            tail = lines.pop()
+            for line in lines:
+                yield line + b'\n'
+        if tail:
+            yield tail